@@ -20,6 +20,7 @@ def default_formats():
         the name of the nbconvert template to add to config.ExporterClass
     - test:
         a function(notebook_object, notebook_json)
+        notebook_json is the raw notebook source, str or bytes.
         conditionally offer a format based on content if truthy. see
         `RenderingHandler.filter_exporters`
     - postprocess:
@@ -38,7 +39,7 @@ def default_formats():
         ----------
         nb: nbformat.notebooknode.NotebookNode
             Top of the parsed notebook object model
-        json: str
+        json: str or bytes
             JSON source of the notebook, unused
 
         Returns
@@ -5,34 +5,47 @@
 #  the file COPYING, distributed as part of this software.
 # -----------------------------------------------------------------------------
 import asyncio
+import functools
 import hashlib
-import pickle
+import itertools
+import json
+import re
 import socket
+import struct
 import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime
 from html import escape
 from http.client import responses
+from urllib.parse import parse_qs
 from urllib.parse import quote
+from urllib.parse import unquote
 from urllib.parse import urlencode
 from urllib.parse import urlparse
 from urllib.parse import urlunparse
 
 import statsd
+from nbformat import convert
 from nbformat import current_nbformat
+from nbformat import NBFormatError
 from nbformat import reads
+from nbformat import validate
+from nbformat import ValidationError
+from nbformat import versions as nbformat_versions
+from nbformat.reader import get_version
 from tornado import httpclient
 from tornado import web
 from tornado.concurrent import Future
-from tornado.escape import url_escape
-from tornado.escape import url_unescape
 from tornado.escape import utf8
 from tornado.ioloop import IOLoop
+from tornado.log import app_log
 
 from ..render import NbFormatError
 from ..render import render_notebook
 from ..utils import EmptyClass
 from ..utils import parse_header_links
+from ..utils import STRIP_PARAMS
 from ..utils import time_block
 from ..utils import url_path_join
 
@@ -46,23 +59,216 @@ except ImportError:
         pass
 
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
 format_prefix = "/format/"
 
+# Successful JupyterHub cookie authorizations, cookie -> monotonic expiry.
+# Saves an HTTPS round-trip to the Hub on every request for hot cookies.
+# LRU-bounded; entries are re-checked with the Hub once the TTL passes.
+_hub_auth_cache = OrderedDict()
+_HUB_AUTH_CACHE_TTL = 60
+_HUB_AUTH_CACHE_SIZE = 1024
+
+# status code -> (status message, template name), precomputed so the
+# error path (busy with scanner 404s) skips string formatting per error
+_STATUS_CACHE = {code: (msg, "%d.html" % code) for code, msg in responses.items()}
+
+# pagination only ever follows the next/prev rels, so a single regex
+# scan replaces fully tokenizing the Link header
+_LINK_RE = re.compile(r'<([^>]+)>\s*;\s*rel="(next|prev)"')
+
+
+def _page_query(url):
+    """Extract the query string of a pagination link, as '?...'
+
+    Upstream credentials are stripped, as parse_header_links does.
+    """
+    query = url.partition("?")[2]
+    if any(key in query for key in STRIP_PARAMS):
+        params = parse_qs(query)
+        query = urlencode(
+            {key: value[0] for key, value in params.items() if key not in STRIP_PARAMS}
+        )
+    return "?" + query
+
+
+# Cached responses are framed as a one-byte version tag, a big-endian
+# 4-byte header length, a UTF-8 JSON blob of the cached headers, then the
+# raw body bytes. This avoids pickling (and copying) the entire rendered
+# body on both the write and read paths.
+_CACHE_VERSION = 1
+_CACHE_FRAME = struct.Struct(">BI")
+
+
+@functools.lru_cache(maxsize=4096)
+def _quoted_cookie(cookie):
+    """Memoized quote() of a hub auth cookie
+
+    The same cookie value repeats across many requests from one user,
+    and quote() walks the value byte by byte.
+    """
+    return quote(cookie, safe="")
+
+
+@functools.lru_cache(maxsize=64)
+def _jinja_template(env, name):
+    """Resolve a jinja template once per (environment, name)
+
+    Jinja's own template cache still performs a dict lookup plus
+    auto-reload checks per call; this skips both on the rendering hot path.
+    """
+    return env.get_template(name)
+
+
+def _parse_notebook(json_notebook):
+    """Parse notebook JSON into a NotebookNode at current_nbformat
+
+    Uses orjson when available, which is several times faster than
+    stdlib json on large documents; conversion and validation then
+    mirror nbformat.reads (validation errors are logged, not raised).
+    orjson's JSONDecodeError is a ValueError, so error handling in
+    finish_notebook is unchanged.
+    """
+    if orjson is None:
+        return reads(json_notebook, current_nbformat)
+    nb_dict = orjson.loads(json_notebook)
+    # same path as nbformat.reader.reads, minus the stdlib json parse
+    (major, minor) = get_version(nb_dict)
+    if major not in nbformat_versions:
+        # same error reads() raises; a ValueError, so finish_notebook
+        # reports it as a bad notebook rather than a render failure
+        raise NBFormatError("Unsupported nbformat version %s" % major)
+    nb = nbformat_versions[major].to_notebook_json(nb_dict, minor=minor)
+    nb = convert(nb, current_nbformat)
+    try:
+        validate(nb)
+    except ValidationError as e:
+        app_log.error("Notebook JSON is invalid: %s", e)
+    return nb
+
+
+def _parse_and_render_notebook(format, json_notebook, url, config):
+    """Parse a notebook's JSON and render it as a single executor task
+
+    Fused so that nbformat parsing of large notebooks happens off the
+    event loop along with the render, instead of blocking it.
+    """
+    nb = _parse_notebook(json_notebook)
+    nbhtml, render_config = render_notebook(format, nb, url=url, config=config)
+    return nb, nbhtml, render_config
+
+
+def _encode_cached_response(headers, body):
+    """Pack cached headers and body into the framed cache format"""
+    header_blob = json.dumps(headers).encode("utf-8")
+    return _CACHE_FRAME.pack(_CACHE_VERSION, len(header_blob)) + header_blob + body
+
+
+def _decode_cached_response(data):
+    """Unpack a framed cache entry into (headers, body)
+
+    Returns None for entries in an unrecognized format -- an older
+    (pickled) entry, or a truncated or corrupt frame -- which are
+    treated as cache misses.
+    """
+    if len(data) < _CACHE_FRAME.size:
+        return None
+    version, header_len = _CACHE_FRAME.unpack_from(data)
+    header_end = _CACHE_FRAME.size + header_len
+    if version != _CACHE_VERSION or header_end > len(data):
+        return None
+    try:
+        headers = json.loads(data[_CACHE_FRAME.size : header_end].decode("utf-8"))
+    except ValueError:
+        return None
+    return headers, data[header_end:]
+
 
 class BaseHandler(web.RequestHandler):
     """Base Handler class with common utilities"""
 
+    # shared across all handlers; tornado's AsyncHTTPClient() factory
+    # would return the same instance anyway, this skips the factory call
+    _http_client = None
+
     def initialize(self, format=None, format_prefix="", **handler_settings):
         # format: str, optional
         #     Rendering format (e.g. script, slides, html)
+
+        # snapshot stable settings as plain attributes: a property access
+        # costs a Python call plus a dict lookup, and several of these
+        # are hit many times per request
+        settings = self.settings
+        self.base_url = settings["base_url"]
+        self.binder_base_url = settings["binder_base_url"]
+        self.cache = settings["cache"]
+        self.cache_expiry_max = settings.setdefault("cache_expiry_max", 120)
+        self.cache_expiry_min = settings.setdefault("cache_expiry_min", 60)
+        self.client = settings["client"]
+        self.config = settings["config"]
+        self.default_format = settings["default_format"]
+        self.fetch_kwargs = settings.setdefault("fetch_kwargs", {})
+        self.formats = settings["formats"]
+        self.frontpage_setup = settings["frontpage_setup"]
+        self.hub_api_token = settings.get("hub_api_token")
+        self.hub_api_url = settings.get("hub_api_url")
+        self.hub_base_url = settings["hub_base_url"]
+        self.index = settings["index"]
+        self.ipywidgets_base_url = settings["ipywidgets_base_url"]
+        self.jupyter_js_widgets_version = settings["jupyter_js_widgets_version"]
+        self.jupyter_widgets_html_manager_version = settings[
+            "jupyter_widgets_html_manager_version"
+        ]
+        self.log = settings["log"]
+        self.mathjax_url = settings["mathjax_url"]
+        self.max_cache_uris = settings.setdefault("max_cache_uris", set())
+        self.pending = settings.setdefault("pending", {})
+        self.pool = settings["pool"]
+        self.providers = settings["providers"]
+        self.rate_limiter = settings["rate_limiter"]
+        self.static_url_prefix = settings["static_url_prefix"]
+        # background task references shared app-wide, so cache writes
+        # survive the request and can be drained at shutdown
+        self._background_tasks = settings.setdefault("background_tasks", set())
+
         self.format = format or self.default_format
         self.format_prefix = format_prefix
-        self.http_client = httpclient.AsyncHTTPClient()
+        if self.hub_api_url:
+            # constant prefix of the Hub authorization URL; only the
+            # cookie value needs quoting per request
+            self._hub_auth_url_base = url_path_join(
+                self.hub_api_url, "authorizations/cookie", self.hub_cookie_name
+            )
+        if BaseHandler._http_client is None:
+            BaseHandler._http_client = httpclient.AsyncHTTPClient()
+        self.http_client = BaseHandler._http_client
         self.date_fmt = "%a, %d %b %Y %H:%M:%S UTC"
 
         for handler_setting in handler_settings:
             setattr(self, handler_setting, handler_settings[handler_setting])
 
+        # all members are derived from stable settings entries,
+        # so build the namespace once per handler instead of per render
+        self._template_namespace = {
+            "mathjax_url": self.mathjax_url,
+            "static_url": self.static_url,
+            "from_base": self.from_base,
+            "google_analytics_id": self.settings.get("google_analytics_id"),
+            "ipywidgets_base_url": self.ipywidgets_base_url,
+            "jupyter_js_widgets_version": self.jupyter_js_widgets_version,
+            "jupyter_widgets_html_manager_version": self.jupyter_widgets_html_manager_version,
+        }
+
     # Overloaded methods
     def redirect(self, url, *args, **kwargs):
         purl = urlparse(url)
@@ -71,12 +277,9 @@ class BaseHandler(web.RequestHandler):
             (
                 purl.scheme,
                 purl.netloc,
-                "/".join(
-                    [
-                        url_escape(url_unescape(p), plus=False)
-                        for p in purl.path.split("/")
-                    ]
-                ),
+                # single C-level pass over the whole path instead of
+                # unescape/escape/join per segment
+                quote(unquote(purl.path), safe="/"),
                 purl.params,
                 purl.query,
                 purl.fragment,
@@ -111,150 +314,73 @@ class BaseHandler(web.RequestHandler):
                 # no cookie == not authenticated
                 return redirect_to_login()
 
+            if _hub_auth_cache.get(encrypted_cookie, 0) > time.monotonic():
+                # cookie was authorized by the hub recently; skip the fetch
+                _hub_auth_cache.move_to_end(encrypted_cookie)
+                return
+
             try:
                 # if the hub returns a success code, the user is known
                 await self.http_client.fetch(
                     url_path_join(
-                        self.hub_api_url,
-                        "authorizations/cookie",
-                        self.hub_cookie_name,
-                        quote(encrypted_cookie, safe=""),
+                        self._hub_auth_url_base, _quoted_cookie(encrypted_cookie)
                     ),
                     headers={"Authorization": "token " + self.hub_api_token},
                 )
             except httpclient.HTTPError as ex:
                 if ex.response.code == 404:
                     # hub does not recognize the cookie == not authenticated
+                    _hub_auth_cache.pop(encrypted_cookie, None)
                     return redirect_to_login()
                 # let all other errors surface: they're unexpected
                 raise ex
+            else:
+                _hub_auth_cache[encrypted_cookie] = (
+                    time.monotonic() + _HUB_AUTH_CACHE_TTL
+                )
+                _hub_auth_cache.move_to_end(encrypted_cookie)
+                while len(_hub_auth_cache) > _HUB_AUTH_CACHE_SIZE:
+                    _hub_auth_cache.popitem(last=False)
 
     # Properties
 
-    @property
-    def base_url(self):
-        return self.settings["base_url"]
-
-    @property
-    def binder_base_url(self):
-        return self.settings["binder_base_url"]
-
-    @property
-    def cache(self):
-        return self.settings["cache"]
-
-    @property
-    def cache_expiry_max(self):
-        return self.settings.setdefault("cache_expiry_max", 120)
-
-    @property
-    def cache_expiry_min(self):
-        return self.settings.setdefault("cache_expiry_min", 60)
-
-    @property
-    def client(self):
-        return self.settings["client"]
-
-    @property
-    def config(self):
-        return self.settings["config"]
-
     @property
     def content_security_policy(self):
+        # accessed via set_default_headers, which tornado calls before
+        # initialize, so this cannot be snapshotted there
         return self.settings["content_security_policy"]
 
-    @property
-    def default_format(self):
-        return self.settings["default_format"]
-
-    @property
-    def formats(self):
-        return self.settings["formats"]
-
-    @property
-    def frontpage_setup(self):
-        return self.settings["frontpage_setup"]
-
-    @property
-    def hub_api_token(self):
-        return self.settings.get("hub_api_token")
-
-    @property
-    def hub_api_url(self):
-        return self.settings.get("hub_api_url")
-
-    @property
-    def hub_base_url(self):
-        return self.settings["hub_base_url"]
-
     @property
     def hub_cookie_name(self):
         return "jupyterhub-services"
 
-    @property
-    def index(self):
-        return self.settings["index"]
-
-    @property
-    def ipywidgets_base_url(self):
-        return self.settings["ipywidgets_base_url"]
-
-    @property
-    def jupyter_js_widgets_version(self):
-        return self.settings["jupyter_js_widgets_version"]
-
-    @property
-    def jupyter_widgets_html_manager_version(self):
-        return self.settings["jupyter_widgets_html_manager_version"]
-
-    @property
-    def mathjax_url(self):
-        return self.settings["mathjax_url"]
-
-    @property
-    def log(self):
-        return self.settings["log"]
-
-    @property
-    def max_cache_uris(self):
-        return self.settings.setdefault("max_cache_uris", set())
-
-    @property
-    def pending(self):
-        return self.settings.setdefault("pending", {})
-
-    @property
-    def pool(self):
-        return self.settings["pool"]
-
-    @property
-    def providers(self):
-        return self.settings["providers"]
-
-    @property
-    def rate_limiter(self):
-        return self.settings["rate_limiter"]
-
-    @property
-    def static_url_prefix(self):
-        return self.settings["static_url_prefix"]
-
     @property
     def statsd(self):
         if hasattr(self, "_statsd"):
             return self._statsd
         if self.settings["statsd_host"]:
-            self._statsd = statsd.StatsClient(
+            # batch this request's metrics in a pipeline so they go out
+            # as one UDP packet from on_finish instead of one per call
+            client = statsd.StatsClient(
                 self.settings["statsd_host"],
                 self.settings["statsd_port"],
                 self.settings["statsd_prefix"] + "." + type(self).__name__,
             )
+            self._statsd = client.pipeline()
+            self._statsd_is_pipeline = True
             return self._statsd
         else:
             # return an empty mock object!
             self._statsd = EmptyClass()
             return self._statsd
 
+    _statsd_is_pipeline = False
+
+    def on_finish(self):
+        if self._statsd_is_pipeline:
+            self._statsd.send()
+        super().on_finish()
+
     # ---------------------------------------------------------------
     # template rendering
     # ---------------------------------------------------------------
@@ -266,10 +392,10 @@ class BaseHandler(web.RequestHandler):
 
     def get_template(self, name):
         """Return the jinja template object for a given name"""
-        return self.settings["jinja2_env"].get_template(name)
+        return _jinja_template(self.settings["jinja2_env"], name)
 
     def render_template(self, name, **namespace):
-        namespace.update(self.template_namespace)
+        namespace = {**namespace, **self.template_namespace}
         template = self.get_template(name)
         return template.render(**namespace)
 
@@ -277,22 +403,20 @@ class BaseHandler(web.RequestHandler):
     # This would seem to mostly involve creating different template namespaces to enable custom logic in
     # extended templates, but there might be other possibilities
     def render_status_code_template(self, status_code, **namespace):
-        return self.render_template("%d.html" % status_code, **namespace)
+        cached = _STATUS_CACHE.get(status_code)
+        if cached is not None:
+            template_name = cached[1]
+        else:
+            # unknown status codes are rare enough to format on demand
+            template_name = "%d.html" % status_code
+        return self.render_template(template_name, **namespace)
 
     def render_error_template(self, **namespace):
         return self.render_template("error.html", **namespace)
 
     @property
     def template_namespace(self):
-        return {
-            "mathjax_url": self.mathjax_url,
-            "static_url": self.static_url,
-            "from_base": self.from_base,
-            "google_analytics_id": self.settings.get("google_analytics_id"),
-            "ipywidgets_base_url": self.ipywidgets_base_url,
-            "jupyter_js_widgets_version": self.jupyter_js_widgets_version,
-            "jupyter_widgets_html_manager_version": self.jupyter_widgets_html_manager_version,
-        }
+        return self._template_namespace
 
     # Overwrite the static_url method from Tornado to work better with our custom StaticFileHandler
     def static_url(self, url):
@@ -300,14 +424,15 @@ class BaseHandler(web.RequestHandler):
 
     def breadcrumbs(self, path, base_url):
         """Generate a list of breadcrumbs"""
-        breadcrumbs = []
         if not path:
-            return breadcrumbs
+            return []
 
-        for name in path.split("/"):
-            base_url = url_path_join(base_url, name)
-            breadcrumbs.append({"url": base_url, "name": name})
-        return breadcrumbs
+        parts = path.split("/")
+        urls = itertools.accumulate(
+            parts, lambda url, name: url + "/" + name, initial=base_url.rstrip("/")
+        )
+        next(urls)  # skip the bare base_url
+        return [{"url": url, "name": name} for url, name in zip(urls, parts)]
 
     def get_page_links(self, response):
         """return prev_url, next_url for pagination
@@ -316,12 +441,27 @@ class BaseHandler(web.RequestHandler):
 
         Each will be None if there no such link.
         """
-        links = parse_header_links(response.headers.get("Link", ""))
+        link_header = response.headers.get("Link", "")
         next_url = prev_url = None
-        if "next" in links:
-            next_url = "?" + urlparse(links["next"]["url"]).query
-        if "prev" in links:
-            prev_url = "?" + urlparse(links["prev"]["url"]).query
+        if not link_header:
+            return prev_url, next_url
+
+        matched = False
+        for match in _LINK_RE.finditer(link_header):
+            matched = True
+            url, rel = match.groups()
+            if rel == "next":
+                next_url = _page_query(url)
+            else:
+                prev_url = _page_query(url)
+
+        if not matched:
+            # unconventional header; fall back to the full tokenizer
+            links = parse_header_links(link_header)
+            if "next" in links:
+                next_url = "?" + urlparse(links["next"]["url"]).query
+            if "prev" in links:
+                prev_url = "?" + urlparse(links["prev"]["url"]).query
         return prev_url, next_url
 
     # ---------------------------------------------------------------
@@ -380,9 +520,9 @@ class BaseHandler(web.RequestHandler):
 
         code, msg = self.client_error_message(exc, url, body)
 
-        slim_body = escape(body[:300])
-
-        self.log.warn("Fetching %s failed with %s. Body=%s", url, msg, slim_body)
+        # log lines are not HTML: the slice doesn't need escaping.
+        # msg is escaped where it is built, since HTTPError surfaces it.
+        self.log.warn("Fetching %s failed with %s. Body=%s", url, msg, body[:300])
         raise web.HTTPError(code, msg)
 
     @contextmanager
@@ -390,6 +530,10 @@ class BaseHandler(web.RequestHandler):
         """context manager for catching httpclient errors
 
         they are transformed into appropriate web.HTTPErrors
+
+        Deprecated: on hot paths, prefer a direct try/except around the
+        fetch (as BaseHandler.fetch does) to avoid the per-call generator
+        and __enter__/__exit__ overhead of the context manager.
         """
         try:
             yield
@@ -398,10 +542,6 @@ class BaseHandler(web.RequestHandler):
         except socket.error as e:
             raise web.HTTPError(404, str(e))
 
-    @property
-    def fetch_kwargs(self):
-        return self.settings.setdefault("fetch_kwargs", {})
-
     async def fetch(self, url, **overrides):
         """fetch a url with our async client
 
@@ -410,15 +550,20 @@ class BaseHandler(web.RequestHandler):
         kw = {}
         kw.update(self.fetch_kwargs)
         kw.update(overrides)
-        with self.catch_client_error():
+        # inlined catch_client_error: this runs several times per render
+        try:
             response = await self.client.fetch(url, **kw)
+        except httpclient.HTTPError as e:
+            self.reraise_client_error(e)
+        except socket.error as e:
+            raise web.HTTPError(404, str(e))
         return response
 
     def write_error(self, status_code, **kwargs):
         """render custom error pages"""
         exc_info = kwargs.get("exc_info")
         message = ""
-        status_message = responses.get(status_code, "Unknown")
+        status_message, _ = _STATUS_CACHE.get(status_code, ("Unknown", ""))
         if exc_info:
             # get the custom message, if defined
             exception = exc_info[1]
@@ -463,6 +608,8 @@ class BaseHandler(web.RequestHandler):
 
     _cache_key = None
     _cache_key_attr = "uri"
+    # in-flight background write from cache_and_finish, if any
+    _cache_set_task = None
 
     @property
     def cache_key(self):
@@ -471,13 +618,18 @@ class BaseHandler(web.RequestHandler):
 
         if self._cache_key is None:
             to_hash = utf8(getattr(self.request, self._cache_key_attr))
-            self._cache_key = hashlib.sha1(to_hash).hexdigest()
+            if blake3 is not None:
+                self._cache_key = blake3.blake3(to_hash).hexdigest(length=20)
+            else:
+                self._cache_key = hashlib.blake2b(to_hash, digest_size=20).hexdigest()
         return self._cache_key
 
-    def truncate(self, s, limit=256):
+    @staticmethod
+    def truncate(s, limit=256):
         """Truncate long strings"""
         if len(s) > limit:
-            s = "%s...%s" % (s[: limit // 2], s[limit // 2 :])
+            half = limit >> 1
+            s = f"{s[:half]}...{s[half:]}"
         return s
 
     async def cache_and_finish(self, content=""):
@@ -503,20 +655,31 @@ class BaseHandler(web.RequestHandler):
         if expiry > 0:
             self.set_header("Cache-Control", "max-age=%i" % expiry)
 
-        self.write(content)
+        # encode once: the same bytes are written to the response and cached
+        body = utf8(content)
+        self.write(body)
         self.finish()
 
         short_url = self.truncate(self.request.path)
-        cache_data = pickle.dumps(
-            {"headers": self.cache_headers, "body": content}, pickle.HIGHEST_PROTOCOL
-        )
+        cache_data = _encode_cached_response(self.cache_headers, body)
         log = self.log.info if expiry > self.cache_expiry_min else self.log.debug
         log("Caching (expiry=%is) %s", expiry, short_url)
+        # detach the cache write so the request doesn't stay alive for it;
+        # the response has already been finished above. cached() chains
+        # resolution of the pending future onto this task so coalesced
+        # waiters don't look in the cache before the write lands.
+        task = self._cache_set_task = asyncio.create_task(
+            self._cache_set(self.cache_key, cache_data, int(time.time() + expiry))
+        )
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _cache_set(self, cache_key, cache_data, expiry_time):
+        """Store a rendered response in the cache as a background task"""
+        short_url = self.truncate(self.request.path)
         try:
             with time_block("Cache set %s" % short_url, logger=self.log):
-                await self.cache.set(
-                    self.cache_key, cache_data, int(time.time() + expiry)
-                )
+                await self.cache.set(cache_key, cache_data, expiry_time)
         except Exception:
             self.log.error("Cache set for %s failed", short_url, exc_info=True)
         else:
@@ -541,7 +704,9 @@ def cached(method):
             await method(self, *args, **kwargs)
             return
 
-        pending_future = self.pending.get(uri, None)
+        # key in-flight requests on the cache key, so that URI variants
+        # (query strings, etc.) of the same resource coalesce into one render
+        pending_future = self.pending.get(self.cache_key, None)
         loop = IOLoop.current()
         if pending_future:
             self.log.info("Waiting for concurrent request at %s", short_url)
@@ -554,9 +719,9 @@ def cached(method):
 
         try:
             with time_block("Cache get %s" % short_url, logger=self.log):
-                cached_pickle = await self.cache.get(self.cache_key)
-            if cached_pickle is not None:
-                cached = pickle.loads(cached_pickle)
+                cached_response = await self.cache.get(self.cache_key)
+            if cached_response is not None:
+                cached = _decode_cached_response(cached_response)
             else:
                 cached = None
         except Exception as e:
@@ -565,20 +730,30 @@ def cached(method):
 
         if cached is not None:
             self.log.info("Cache hit %s", short_url)
-            for key, value in cached["headers"].items():
+            headers, body = cached
+            for key, value in headers.items():
                 self.set_header(key, value)
-            self.write(cached["body"])
+            self.write(body)
         else:
             self.log.debug("Cache miss %s", short_url)
             await self.rate_limiter.check(self)
-            future = self.pending[uri] = Future()
+            future = self.pending[self.cache_key] = Future()
             try:
                 # call the wrapped method
                 await method(self, *args, **kwargs)
             finally:
-                self.pending.pop(uri, None)
-                # notify waiters
-                future.set_result(None)
+
+                def notify_waiters(_=None):
+                    self.pending.pop(self.cache_key, None)
+                    future.set_result(None)
+
+                # if the render kicked off a background cache write, hold
+                # waiters until it lands so their cache.get is a hit;
+                # otherwise (error, flush, non-caching path) notify now
+                if self._cache_set_task is not None:
+                    self._cache_set_task.add_done_callback(notify_waiters)
+                else:
+                    notify_waiters()
 
     return cached_method
 
@@ -612,11 +787,27 @@ class RenderingHandler(BaseHandler):
         self.log.info("Finishing early %s", self.request.uri)
         html = self.render_template("slow_notebook.html")
         self.set_status(202)  # Accepted
+        # count the metric before finish() so it makes the pipeline flush
+        self.statsd.incr("rendering.waiting", 1)
         self.finish(html)
 
         # short circuit some methods because the rest of the rendering will still happen
         self.write = self.finish = self.redirect = lambda chunk=None: None
-        self.statsd.incr("rendering.waiting", 1)
+
+    @property
+    def _formats_resolved(self):
+        """(name, format, test) tuples, resolved once for the app
+
+        filter_formats runs for every rendered notebook; pre-resolving the
+        test callables avoids re-iterating the formats dict per render.
+        """
+        resolved = self.settings.get("_formats_resolved")
+        if resolved is None:
+            resolved = self.settings["_formats_resolved"] = tuple(
+                (name, format, format.get("test", None))
+                for name, format in self.formats.items()
+            )
+        return resolved
 
     def filter_formats(self, nb, raw):
         """Generate a list of formats that can render the given nb json
@@ -624,10 +815,12 @@ class RenderingHandler(BaseHandler):
         formats that do not provide a `test` method are assumed to work for
         any notebook
         """
-        for name, format in self.formats.items():
-            test = format.get("test", None)
+        for name, format, test in self._formats_resolved:
+            if test is None:
+                yield (name, format)
+                continue
             try:
-                if test is None or test(nb, raw):
+                if test(nb, raw):
                     yield (name, format)
             except Exception as err:
                 self.log.info("Failed to test %s: %s", self.request.uri, name)
@@ -686,8 +879,10 @@ class RenderingHandler(BaseHandler):
 
         Parameters
         ----------
-        json_notebook: str
-            Notebook document in JSON format
+        json_notebook: str or bytes
+            Notebook document in UTF-8 JSON format.
+            Passing the raw bytes of the upstream response avoids an
+            encode/decode round-trip of the whole document.
         download_url: str
             URL to download the notebook document
         msg: str, optional
@@ -700,61 +895,69 @@ class RenderingHandler(BaseHandler):
             msg = download_url
 
         try:
-            parse_time = self.statsd.timer("rendering.parsing.time").start()
-            nb = reads(json_notebook, current_nbformat)
-            parse_time.stop()
-        except ValueError:
-            self.log.error("Failed to render %s", msg, exc_info=True)
-            self.statsd.incr("rendering.parsing.fail")
-            raise web.HTTPError(400, "Error reading JSON notebook")
+            try:
+                self.log.debug("Requesting render of %s", download_url)
+                with time_block(
+                    "Rendered %s" % download_url, logger=self.log, debug_limit=0
+                ):
+                    self.log.info(
+                        "Rendering %d B notebook from %s",
+                        len(json_notebook),
+                        download_url,
+                    )
+                    render_time = self.statsd.timer("rendering.nbrender.time").start()
+                    loop = asyncio.get_event_loop()
+                    # parse and render in one executor task, so JSON parsing
+                    # of large notebooks doesn't block the event loop
+                    nb, nbhtml, config = await loop.run_in_executor(
+                        self.pool,
+                        _parse_and_render_notebook,
+                        self.formats[self.format],
+                        json_notebook,
+                        download_url,
+                        self.config,
+                    )
+                    render_time.stop()
+            except NbFormatError as e:
+                self.statsd.incr("rendering.nbrender.fail", 1)
+                self.log.error("Invalid notebook %s: %s", msg, e)
+                raise web.HTTPError(400, str(e))
+            except ValueError:
+                self.log.error("Failed to render %s", msg, exc_info=True)
+                self.statsd.incr("rendering.parsing.fail")
+                raise web.HTTPError(400, "Error reading JSON notebook")
+            except Exception as e:
+                self.statsd.incr("rendering.nbrender.fail", 1)
+                self.log.error("Failed to render %s", msg, exc_info=True)
+                raise web.HTTPError(400, str(e))
+            else:
+                self.statsd.incr("rendering.nbrender.success", 1)
+                self.log.debug("Finished render of %s", download_url)
+
+            html_time = self.statsd.timer("rendering.html.time").start()
+            html = self.render_notebook_template(
+                body=nbhtml,
+                nb=nb,
+                download_url=download_url,
+                json_notebook=json_notebook,
+                **namespace
+            )
+            html_time.stop()
 
-        try:
-            self.log.debug("Requesting render of %s", download_url)
-            with time_block(
-                "Rendered %s" % download_url, logger=self.log, debug_limit=0
-            ):
-                self.log.info(
-                    "Rendering %d B notebook from %s", len(json_notebook), download_url
+            if "content_type" in self.formats[self.format]:
+                self.set_header(
+                    "Content-Type", self.formats[self.format]["content_type"]
                 )
-                render_time = self.statsd.timer("rendering.nbrender.time").start()
-                loop = asyncio.get_event_loop()
-                nbhtml, config = await loop.run_in_executor(
-                    self.pool,
-                    render_notebook,
-                    self.formats[self.format],
-                    nb,
-                    download_url,
-                    self.config,
-                )
-                render_time.stop()
-        except NbFormatError as e:
-            self.statsd.incr("rendering.nbrender.fail", 1)
-            self.log.error("Invalid notebook %s: %s", msg, e)
-            raise web.HTTPError(400, str(e))
-        except Exception as e:
-            self.statsd.incr("rendering.nbrender.fail", 1)
-            self.log.error("Failed to render %s", msg, exc_info=True)
-            raise web.HTTPError(400, str(e))
-        else:
-            self.statsd.incr("rendering.nbrender.success", 1)
-            self.log.debug("Finished render of %s", download_url)
-
-        html_time = self.statsd.timer("rendering.html.time").start()
-        html = self.render_notebook_template(
-            body=nbhtml,
-            nb=nb,
-            download_url=download_url,
-            json_notebook=json_notebook,
-            **namespace
-        )
-        html_time.stop()
-
-        if "content_type" in self.formats[self.format]:
-            self.set_header("Content-Type", self.formats[self.format]["content_type"])
-        await self.cache_and_finish(html)
+            await self.cache_and_finish(html)
 
-        # Index notebook
-        self.index.index_notebook(download_url, nb, public)
+            # Index notebook
+            self.index.index_notebook(download_url, nb, public)
+        finally:
+            if self._finished and self._statsd_is_pipeline:
+                # when finish_early has already sent the response, on_finish
+                # flushed the pipeline before the render completed; flush
+                # again so metrics recorded since then aren't dropped
+                self._statsd.send()
 
 
 class FilesRedirectHandler(BaseHandler):
@@ -773,9 +976,8 @@ class AddSlashHandler(BaseHandler):
 
     def get(self, *args, **kwargs):
         uri = self.request.path + "/"
-        if self.request.query:
-            uri = "%s?%s" % (uri, self.request.query)
-        self.redirect(uri)
+        query = self.request.query
+        self.redirect(f"{uri}?{query}" if query else uri)
 
 
 class RemoveSlashHandler(BaseHandler):
@@ -783,6 +985,5 @@ class RemoveSlashHandler(BaseHandler):
 
     def get(self, *args, **kwargs):
         uri = self.request.path.rstrip("/")
-        if self.request.query:
-            uri = "%s?%s" % (uri, self.request.query)
-        self.redirect(uri)
+        query = self.request.query
+        self.redirect(f"{uri}?{query}" if query else uri)
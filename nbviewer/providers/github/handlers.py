@@ -401,16 +401,7 @@ class GitHubBlobHandler(GithubClientMixin, RenderingHandler):
                 else None
             )
 
-            try:
-                # filedata may be bytes, but we need text
-                if isinstance(filedata, bytes):
-                    nbjson = filedata.decode("utf-8")
-                else:
-                    nbjson = filedata
-            except Exception as e:
-                self.log.error("Failed to decode notebook: %s", raw_url, exc_info=True)
-                raise web.HTTPError(400)
-
+            # filedata may be bytes or text; finish_notebook accepts both
             # Explanation of some kwargs passed into `finish_notebook`:
             # provider_url:
             #     URL to the notebook document upstream at the provider (e.g., GitHub)
@@ -419,7 +410,7 @@ class GitHubBlobHandler(GithubClientMixin, RenderingHandler):
             # executor_url: str, optional
             #     URL to execute the notebook document (e.g., Binder)
             await self.finish_notebook(
-                nbjson,
+                filedata,
                 raw_url,
                 provider_url=blob_url,
                 executor_url=executor_url,
@@ -150,7 +150,8 @@ class LocalFileHandler(RenderingHandler):
 
     async def deliver_notebook(self, fullpath, path):
         try:
-            with io.open(fullpath, encoding="utf-8") as f:
+            # read raw bytes; finish_notebook parses UTF-8 JSON directly
+            with io.open(fullpath, "rb") as f:
                 nbdata = f.read()
         except IOError as ex:
             if ex.errno == errno.EACCES:
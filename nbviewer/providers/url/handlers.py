@@ -69,14 +69,10 @@ class URLHandler(RenderingHandler):
     async def deliver_notebook(self, remote_url, public):
         response = await self.fetch(remote_url)
 
-        try:
-            nbjson = response_text(response, encoding="utf-8")
-        except UnicodeDecodeError:
-            self.log.error("Notebook is not utf8: %s", remote_url, exc_info=True)
-            raise web.HTTPError(400)
-
+        # pass the raw bytes straight through; the JSON parser handles
+        # UTF-8 and rejects anything undecodable with a 400
         await self.finish_notebook(
-            nbjson,
+            response.body,
             download_url=remote_url,
             msg="file from url: %s" % remote_url,
             public=public,
@@ -21,10 +21,46 @@ import requests
 from tornado.escape import to_unicode
 from tornado.log import app_log
 
+from nbviewer.cache import MockCache
+from nbviewer.formats import default_formats
 from nbviewer.providers.github.client import AsyncGitHubClient
+from nbviewer.ratelimit import RateLimiter
 from nbviewer.utils import url_path_join
 
 
+def handler_settings(**overrides):
+    """Minimal application settings for BaseHandler subclasses
+
+    Enough to construct handlers in-process with tornado's testing
+    classes, without booting a full nbviewer server.
+    """
+    settings = dict(
+        base_url="/",
+        binder_base_url="https://mybinder.org/v2",
+        cache=MockCache(),
+        client=None,
+        config=None,
+        content_security_policy="",
+        default_format="html",
+        formats=default_formats(),
+        frontpage_setup={},
+        hub_base_url="",
+        index=None,
+        ipywidgets_base_url="https://unpkg.com/",
+        jupyter_js_widgets_version="*",
+        jupyter_widgets_html_manager_version="*",
+        log=app_log,
+        mathjax_url="https://cdn.mathjax.org/mathjax/latest/",
+        pool=None,
+        providers=[],
+        rate_limiter=RateLimiter(limit=0, interval=600, cache=None),
+        static_url_prefix="/static/",
+        statsd_host="",
+    )
+    settings.update(overrides)
+    return settings
+
+
 class NBViewerTestCase(TestCase):
     """A base class for tests that need a running nbviewer server."""
 
@@ -0,0 +1,45 @@
+# encoding: utf-8
+# -----------------------------------------------------------------------------
+#  Copyright (C) Jupyter Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+# -----------------------------------------------------------------------------
+import pickle
+
+import nose.tools as nt
+
+from nbviewer.providers.base import _decode_cached_response
+from nbviewer.providers.base import _encode_cached_response
+
+
+def test_round_trip():
+    headers = {"Content-Type": "text/html; charset=UTF-8"}
+    body = u"<html>unicodé</html>".encode("utf-8")
+    data = _encode_cached_response(headers, body)
+    nt.assert_equal(_decode_cached_response(data), (headers, body))
+
+
+def test_round_trip_empty():
+    data = _encode_cached_response({}, b"")
+    nt.assert_equal(_decode_cached_response(data), ({}, b""))
+
+
+def test_truncated_frame_is_miss():
+    data = _encode_cached_response({"Content-Type": "text/html"}, b"body")
+    # cut the frame anywhere before the end of the header blob
+    for end in (0, 1, len(data) - len(b"body") - 1):
+        nt.assert_is_none(_decode_cached_response(data[:end]))
+
+
+def test_garbage_is_miss():
+    nt.assert_is_none(_decode_cached_response(b"\x01\xff\xff\xff\xffgarbage"))
+
+
+def test_legacy_pickle_is_miss():
+    # entries written before the framed format was a pickled
+    # (headers, body) tuple; they must read as a cache miss, not an error
+    legacy = pickle.dumps(
+        ({"Content-Type": "text/html"}, b"<html></html>"), pickle.HIGHEST_PROTOCOL
+    )
+    nt.assert_is_none(_decode_cached_response(legacy))
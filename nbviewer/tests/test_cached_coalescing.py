@@ -0,0 +1,97 @@
+# encoding: utf-8
+# -----------------------------------------------------------------------------
+#  Copyright (C) Jupyter Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+# -----------------------------------------------------------------------------
+import asyncio
+
+from tornado import web
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import gen_test
+
+from nbviewer.cache import DummyAsyncCache
+from nbviewer.providers.base import BaseHandler
+from nbviewer.providers.base import cached
+from nbviewer.tests.base import handler_settings
+
+
+class ControlledCache(DummyAsyncCache):
+    """DummyAsyncCache whose set() blocks until the test releases it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_started = asyncio.Event()
+        self.release_set = asyncio.Event()
+
+    async def set(self, key, value, expires=0):
+        self.set_started.set()
+        await self.release_set.wait()
+        return await super().set(key, value, expires)
+
+
+class CountingHandler(BaseHandler):
+    renders = 0
+
+    @cached
+    async def get(self):
+        CountingHandler.renders += 1
+        await self.cache_and_finish("rendered")
+
+
+class FailingHandler(BaseHandler):
+    @cached
+    async def get(self):
+        raise web.HTTPError(400, "nope")
+
+    def write_error(self, status_code, **kwargs):
+        # skip template rendering; only the status code matters here
+        self.finish("error")
+
+
+class CachedCoalescingTestCase(AsyncHTTPTestCase):
+    def setUp(self):
+        CountingHandler.renders = 0
+        super().setUp()
+
+    def get_app(self):
+        self.cache = ControlledCache()
+        self.pending = {}
+        settings = handler_settings(cache=self.cache, pending=self.pending)
+        return web.Application(
+            [(r"/render", CountingHandler), (r"/fail", FailingHandler)], **settings
+        )
+
+    @gen_test
+    async def test_waiters_wait_for_cache_write(self):
+        client = AsyncHTTPClient()
+        url = self.get_url("/render")
+
+        response = await client.fetch(url)
+        self.assertEqual(response.body, b"rendered")
+        # the response has been sent, but the cache write is still in
+        # flight; a coalesced waiter must not be released yet, or its
+        # cache.get would miss and trigger a second render
+        await self.cache.set_started.wait()
+        waiter = asyncio.ensure_future(client.fetch(url))
+        await asyncio.sleep(0.1)
+        self.assertFalse(waiter.done())
+
+        self.cache.release_set.set()
+        response = await waiter
+        self.assertEqual(response.body, b"rendered")
+        self.assertEqual(CountingHandler.renders, 1)
+        self.assertEqual(self.pending, {})
+
+    @gen_test
+    async def test_error_path_releases_immediately(self):
+        client = AsyncHTTPClient()
+
+        response = await client.fetch(self.get_url("/fail"), raise_error=False)
+        self.assertEqual(response.code, 400)
+        # no cache write was started, so the pending future must have
+        # been resolved without waiting on one
+        self.assertEqual(self.pending, {})
+        self.assertFalse(self.cache.set_started.is_set())
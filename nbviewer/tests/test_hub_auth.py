@@ -0,0 +1,120 @@
+# encoding: utf-8
+# -----------------------------------------------------------------------------
+#  Copyright (C) Jupyter Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+# -----------------------------------------------------------------------------
+import time
+
+from tornado import httpclient
+from tornado import web
+from tornado.testing import AsyncHTTPTestCase
+
+from nbviewer.providers import base
+from nbviewer.providers.base import BaseHandler
+from nbviewer.tests.base import handler_settings
+
+# matches BaseHandler.hub_cookie_name
+COOKIE = "jupyterhub-services"
+
+
+class FakeHubResponse:
+    code = 404
+
+
+class FakeHubClient:
+    """Stands in for the shared AsyncHTTPClient during hub auth"""
+
+    def __init__(self):
+        self.fetch_count = 0
+        self.error = None
+
+    async def fetch(self, url, **kwargs):
+        self.fetch_count += 1
+        if self.error is not None:
+            raise self.error
+        return None
+
+
+class WhoamiHandler(BaseHandler):
+    async def get(self):
+        self.finish("ok")
+
+
+class HubAuthCacheTestCase(AsyncHTTPTestCase):
+    def setUp(self):
+        base._hub_auth_cache.clear()
+        self.hub_client = FakeHubClient()
+        BaseHandler._http_client = self.hub_client
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        BaseHandler._http_client = None
+        base._hub_auth_cache.clear()
+
+    def get_app(self):
+        settings = handler_settings(
+            hub_api_url="http://127.0.0.1:8081/hub/api",
+            hub_api_token="secret",
+            hub_base_url="/",
+        )
+        return web.Application([(r"/", WhoamiHandler)], **settings)
+
+    def get_with_cookie(self, cookie):
+        return self.fetch(
+            "/",
+            headers={"Cookie": "%s=%s" % (COOKIE, cookie)},
+            follow_redirects=False,
+            raise_error=False,
+        )
+
+    def test_no_cookie_redirects_to_login(self):
+        response = self.fetch("/", follow_redirects=False, raise_error=False)
+        self.assertEqual(response.code, 302)
+        self.assertTrue(response.headers["Location"].startswith("/hub/login"))
+        self.assertEqual(self.hub_client.fetch_count, 0)
+
+    def test_authorized_cookie_is_cached(self):
+        for _ in range(2):
+            response = self.get_with_cookie("abc")
+            self.assertEqual(response.code, 200)
+        # the second request must not have asked the hub again
+        self.assertEqual(self.hub_client.fetch_count, 1)
+        self.assertIn("abc", base._hub_auth_cache)
+
+    def test_expired_entry_rechecks_with_hub(self):
+        self.get_with_cookie("abc")
+        self.assertEqual(self.hub_client.fetch_count, 1)
+        # age the entry past its TTL
+        base._hub_auth_cache["abc"] = time.monotonic() - 1
+        response = self.get_with_cookie("abc")
+        self.assertEqual(response.code, 200)
+        self.assertEqual(self.hub_client.fetch_count, 2)
+        self.assertGreater(base._hub_auth_cache["abc"], time.monotonic())
+
+    def test_404_evicts_and_redirects(self):
+        self.get_with_cookie("abc")
+        self.assertIn("abc", base._hub_auth_cache)
+        # hub forgets the cookie; force a re-check by aging the entry
+        base._hub_auth_cache["abc"] = time.monotonic() - 1
+        self.hub_client.error = httpclient.HTTPError(404, response=FakeHubResponse())
+        response = self.get_with_cookie("abc")
+        self.assertEqual(response.code, 302)
+        self.assertTrue(response.headers["Location"].startswith("/hub/login"))
+        self.assertNotIn("abc", base._hub_auth_cache)
+
+    def test_cache_size_is_bounded(self):
+        size = base._HUB_AUTH_CACHE_SIZE
+        base._HUB_AUTH_CACHE_SIZE = 2
+        try:
+            for cookie in ("one", "two", "three"):
+                self.get_with_cookie(cookie)
+        finally:
+            base._HUB_AUTH_CACHE_SIZE = size
+        self.assertEqual(len(base._hub_auth_cache), 2)
+        # oldest entry is the one evicted
+        self.assertNotIn("one", base._hub_auth_cache)
+        self.assertIn("two", base._hub_auth_cache)
+        self.assertIn("three", base._hub_auth_cache)